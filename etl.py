@@ -9,14 +9,18 @@ import os
 import re
 import sqlite3
 import hashlib
-from datetime import datetime
-from typing import Tuple, Optional, Dict, Any
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from typing import Tuple, Optional, Dict, Any, List, Union
 
 import numpy as np
+import orjson
 import pandas as pd
 import requests
+import requests_cache
 from dotenv import load_dotenv
-from openpyxl import load_workbook
 
 # Load environment variables
 load_dotenv('.env')
@@ -24,60 +28,55 @@ load_dotenv('.env')
 # Constants
 DATABASE_NAME = 'child_care_data.db'
 EXCEL_FILE_NAME = 'Technical Exercise Data.xlsx'
+SHEET_NAMES = ['source1', 'source2', 'source3']
 API_KEY = os.getenv('api_key')
+INSERT_BATCH_SIZE = 1000
+GEOCODE_CACHE_NAME = 'geocode_cache'
+GEOCODE_CACHE_EXPIRY = timedelta(days=30)
+GEOCODE_TIMEOUT = 5
+GEOCODE_WORKERS = 4
+GEOCODE_MAX_RETRIES = 3
+GEOCODE_BACKOFF = 1.0
 
-# Database setup
-conn = sqlite3.connect(DATABASE_NAME)
-cursor = conn.cursor()
-
-# Create the table (updated schema)
-cursor.execute('''
-CREATE TABLE IF NOT EXISTS child_care_providers (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    accepts_financial_aid TEXT,
-    ages_served TEXT,
-    capacity INTEGER,
-    certificate_expiration_date DATE,
-    city TEXT,
-    address1 TEXT,
-    address2 TEXT,
-    company TEXT,
-    phone TEXT,
-    phone2 TEXT,
-    county TEXT,
-    curriculum_type TEXT,
-    email TEXT,
-    language TEXT,
-    license_status TEXT,
-    license_issued DATE,
-    license_number INTEGER,
-    license_renewed DATE,
-    license_type TEXT,
-    contact_name TEXT,
-    max_age INTEGER,
-    min_age INTEGER,
-    operator TEXT,
-    schedule TEXT,
-    state TEXT,
-    title TEXT,
-    website_address TEXT,
-    zip TEXT,
-    facility_type TEXT,
-    source_file TEXT,
-    etl_timestamp DATETIME,
-    record_hash TEXT
-)
-''')
-
+# Precompiled patterns used on every row
+_NON_DIGIT_RE = re.compile(r'\D')
+_TITLE_RE = re.compile(r'\b(Director|Owner|Primary Caregiver|Other)\b')
+# The fields strptime accepts for %m/%d/%y, so parse_date agrees with parse_dates
+_DATE_RE = re.compile(r'(1[0-2]|0[1-9]|[1-9])/(3[01]|[12]\d|0[1-9]|[1-9]| [1-9])/(\d\d)')
 
-def all_none(data: Dict[str, Any]) -> bool:
-    """Check if all values in a dictionary are None."""
-    return all(value is None for value in data.values())
+# Age groups as (name, flag column, lowest age, highest age) in months
+_AGE_GROUPS = (
+    ('Infants', 'Infant', 0, 11),
+    ('Toddlers', 'Toddler', 12, 23),
+    ('Preschool', 'Preschool', 24, 59),
+    ('School-age', 'School', 60, None),
+)
+_AGE_FLAG_COLUMNS = tuple(flag_column for _, flag_column, _, _ in _AGE_GROUPS)
+_AGE_KEYWORD_BITS = {age_group.lower(): 1 << bit for bit, (age_group, _, _, _) in enumerate(_AGE_GROUPS)}
+# Lookahead so overlapping names (e.g. 'preschool' and 'school-age') all match
+_AGE_KEYWORD_RE = re.compile(
+    '(?=(' + '|'.join(re.escape(keyword) for keyword in _AGE_KEYWORD_BITS) + '))', re.IGNORECASE
+)
+_AGE_COLUMNS = ('Ages Accepted 1', 'AA2', 'AA3', 'AA4') + _AGE_FLAG_COLUMNS
 
+# Loaded columns in insertion order, and the upsert statement built from them
+_COLUMNS = (
+    'accepts_financial_aid', 'ages_served', 'capacity', 'certificate_expiration_date', 'city',
+    'address1', 'address2', 'company', 'phone', 'phone2', 'county', 'curriculum_type', 'email',
+    'license_status', 'license_issued', 'license_number', 'license_renewed', 'license_type',
+    'contact_name', 'max_age', 'min_age', 'operator', 'schedule', 'state', 'title',
+    'website_address', 'zip', 'facility_type', 'source_file', 'record_hash', 'etl_timestamp'
+)
+_UPSERT_SQL = (
+    f"INSERT INTO child_care_providers ({', '.join(_COLUMNS)}) "
+    f"VALUES ({', '.join('?' * len(_COLUMNS))}) "
+    f"ON CONFLICT(address1, city, state) DO UPDATE SET "
+    f"{', '.join(f'{c} = excluded.{c}' for c in _COLUMNS)}"
+)
 
 def clean_phone(phone: str) -> str:
     """Remove non-digit characters from a phone number string."""
-    return re.sub(r'\D', '', str(phone))
+    return _NON_DIGIT_RE.sub('', str(phone))
 
 
 def parse_date(date_str: Optional[str]) -> Optional[datetime.date]:
@@ -86,66 +85,173 @@ def parse_date(date_str: Optional[str]) -> Optional[datetime.date]:
         return None
     if isinstance(date_str, datetime):
         return date_str.date()
+    if isinstance(date_str, date):
+        return date_str
+    # Split MM/DD/YY by hand rather than going through strptime; two-digit
+    # years pivot at 69 the same way %y does
+    match = _DATE_RE.fullmatch(str(date_str))
+    if not match:
+        return None
+    month, day, year = (int(field) for field in match.groups())
     try:
-        return datetime.strptime(str(date_str), '%m/%d/%y').date()
-    except (ValueError, TypeError):
+        return date(year + (1900 if year >= 69 else 2000), month, day)
+    except ValueError:
         return None
 
 
-def get_ages_served(row: pd.Series) -> Tuple[str, Optional[int], Optional[int]]:
-    """Extract ages served information from a data row."""
-    age_ranges = {
-        'Infants': (0, 11),
-        'Toddlers': (12, 23),
-        'Preschool': (24, 59),
-        'School-age': (60, None)
-    }
-    
+def _summarize_ages(mask: int) -> Tuple[str, Optional[int], Optional[int]]:
+    """Describe the age groups whose bits are set in mask."""
     ages = []
     min_age = None
     max_age = None
-
-    # Convert numpy array to pandas Series if necessary
-    if isinstance(row, np.ndarray):
-        row = pd.Series(row, index=['Infant', 'Toddler', 'Preschool', 'School'])
-    elif isinstance(row, dict):
-        row = pd.Series(row)
-
-    # Check if all values are None or NaN
-    if row.isnull().all():
-        return '', None, None
-    
-    for age_group, (low, high) in age_ranges.items():
-        column_name = age_group[:-1] if age_group.endswith('s') else age_group  # Remove 's' for column matching
-        if column_name in row.index and pd.notna(row[column_name]) and str(row[column_name]).upper() == 'Y':
-            ages.append(age_group)
-            if min_age is None or low < min_age:
-                min_age = low
-            if max_age is None or (high is not None and high > max_age):
-                max_age = high
-        elif any(age_group.lower() in str(value).lower() for value in row if pd.notna(value)):
+    for bit, (age_group, _, low, high) in enumerate(_AGE_GROUPS):
+        if mask & (1 << bit):
             ages.append(age_group)
             if min_age is None or low < min_age:
                 min_age = low
             if max_age is None or (high is not None and high > max_age):
                 max_age = high
-    
-    return ', '.join(ages), min_age, max_age if max_age is not None else None
+    return ', '.join(ages), min_age, max_age
+
+
+_AGE_SUMMARIES = {mask: _summarize_ages(mask) for mask in range(1 << len(_AGE_GROUPS))}
+
+
+def get_ages_served(row: Union[pd.Series, Dict[str, Any], np.ndarray]) -> Tuple[str, Optional[int], Optional[int]]:
+    """Extract ages served information from a data row."""
+    # Work on plain dicts; numpy arrays hold the flag columns in order
+    if isinstance(row, np.ndarray):
+        row = dict(zip(_AGE_FLAG_COLUMNS, row))
+    elif isinstance(row, pd.Series):
+        row = row.to_dict()
+
+    # Ignore None and NaN values
+    values = [value for value in row.values() if value is not None and value == value]
+    if not values:
+        return '', None, None
+
+    # Encode the age groups as a 4-bit mask and look up its summary
+    mask = 0
+    for bit, flag_column in enumerate(_AGE_FLAG_COLUMNS):
+        if str(row.get(flag_column)).upper() == 'Y':
+            mask |= 1 << bit
+    for value in values:
+        for match in _AGE_KEYWORD_RE.finditer(str(value)):
+            mask |= _AGE_KEYWORD_BITS[match.group(1).lower()]
+
+    return _AGE_SUMMARIES[mask]
 
 
 def extract_title(name: Optional[str]) -> Optional[str]:
     """Extract a title from a name string."""
-    title_pattern = r'\b(Director|Owner|Primary Caregiver|Other)\b'
-    match = re.search(title_pattern, str(name))
+    match = _TITLE_RE.search(str(name))
     if match:
         return match.group(1)
     return None
 
 
+def _first_present(index: pd.Index, *series: pd.Series) -> pd.Series:
+    """Return the first non-empty value among the given Series for each row."""
+    result = pd.Series(None, index=index, dtype=object)
+    for values in reversed(series):
+        result = values.where(values.notna() & values.ne(''), result)
+    return result
+
+
+def _coalesce(df: pd.DataFrame, *columns: str) -> pd.Series:
+    """Return the first non-empty value among the given columns for each row."""
+    return _first_present(df.index, *(df[column] for column in columns if column in df))
+
+
+def _text(df: pd.DataFrame, column: str) -> pd.Series:
+    """Return a column formatted as text, with missing columns and values as 'None'."""
+    if column not in df:
+        return pd.Series('None', index=df.index)
+    return df[column].map(str)
+
+
+def _nullable(values: pd.Series) -> pd.Series:
+    """Convert a Series to object dtype with missing values as None."""
+    values = values.astype(object)
+    return values.where(values.notna(), None)
+
+
+def clean_phones(phones: pd.Series) -> pd.Series:
+    """Remove non-digit characters from a column of phone numbers."""
+    cleaned = phones.fillna('').astype(str).str.replace(_NON_DIGIT_RE, '', regex=True)
+    return _nullable(cleaned.where(cleaned.ne('')))
+
+
+def parse_dates(dates: pd.Series) -> pd.Series:
+    """Parse a column of date strings or datetimes into datetime.date objects."""
+    parsed = pd.to_datetime(dates, format='%m/%d/%y', errors='coerce')
+    return _nullable(parsed.dt.date)
+
+
+def extract_titles(names: pd.Series) -> pd.Series:
+    """Extract a title from each name in a column."""
+    return _nullable(names.astype(str).str.extract(_TITLE_RE, expand=False))
+
+
+def get_ages_served_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """Extract ages served, min age and max age for every row of a sheet."""
+    index = df.index
+    df = df.reset_index(drop=True)
+
+    mask = pd.Series(0, index=df.index)
+    for bit, flag_column in enumerate(_AGE_FLAG_COLUMNS):
+        if flag_column in df:
+            mask |= df[flag_column].astype(str).str.upper().eq('Y').astype(int) * (1 << bit)
+
+    # One keyword sweep per column, ORing in the bit of every age group found.
+    # Sheets repeat the same few descriptions, so only distinct values are scanned
+    for column in _AGE_COLUMNS:
+        if column not in df:
+            continue
+        codes, values = pd.factorize(df[column])
+        matches = pd.Series(values).astype(str).str.findall(_AGE_KEYWORD_RE).explode().dropna()
+        bits = matches.str.lower().map(_AGE_KEYWORD_BITS).astype(int).rename('bit')
+        # Every age group has its own bit, so summing a value's distinct bits ORs them
+        found = bits.reset_index().drop_duplicates().groupby('index')['bit'].sum()
+        # Missing values have code -1, which picks the trailing zero
+        found = np.append(found.reindex(range(len(values)), fill_value=0).to_numpy(), 0)
+        mask |= found[codes]
+
+    return pd.DataFrame(
+        mask.map(_AGE_SUMMARIES).tolist(),
+        index=index,
+        columns=['ages_served', 'min_age', 'max_age'],
+        dtype=object
+    )
+
+
+@lru_cache(maxsize=None)
+def _geo_session() -> requests_cache.CachedSession:
+    """Return the shared geocoding session, creating it on first use.
+
+    The session keeps connections alive between requests and caches
+    successful responses on disk across runs. The API key is left out of the
+    cache keys and stored responses.
+    """
+    return requests_cache.CachedSession(
+        GEOCODE_CACHE_NAME, backend='sqlite', expire_after=GEOCODE_CACHE_EXPIRY,
+        ignored_parameters=['key']
+    )
+
+
 def geocode_address(address: str) -> Tuple[Optional[str], Optional[str], Optional[str]]:
     """Geocode an address using the TomTom API."""
     url = f"https://api.tomtom.com/search/2/geocode/{address}.json?key={API_KEY}"
-    response = requests.get(url)
+    try:
+        response = _geo_session().get(url, timeout=GEOCODE_TIMEOUT)
+        # Back off exponentially while the API is rate limiting us
+        for attempt in range(GEOCODE_MAX_RETRIES):
+            if response.status_code != 429:
+                break
+            time.sleep(GEOCODE_BACKOFF * 2 ** attempt)
+            response = _geo_session().get(url, timeout=GEOCODE_TIMEOUT)
+    except requests.RequestException:
+        return None, None, None
     if response.status_code == 200:
         data = response.json()
         if data['results']:
@@ -158,106 +264,180 @@ def geocode_address(address: str) -> Tuple[Optional[str], Optional[str], Optiona
     return None, None, None
 
 
-def process_excel_file(file_path: str) -> None:
+def geocode_addresses(addresses: List[Optional[str]]) -> List[Tuple[Optional[str], Optional[str], Optional[str]]]:
+    """Geocode a list of addresses concurrently, skipping empty entries."""
+    def lookup(address: Optional[str]) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+        return geocode_address(address) if address else (None, None, None)
+
+    # Create the shared session up front rather than racing to in the workers
+    _geo_session()
+    with ThreadPoolExecutor(max_workers=GEOCODE_WORKERS) as executor:
+        return list(executor.map(lookup, addresses))
+
+
+def parse_sheet(df: pd.DataFrame, sheet_name: str) -> pd.DataFrame:
+    """Transform one sheet of the Excel file into provider records.
+
+    Columns follow _COLUMNS, without the record hash and load timestamp, plus
+    a full_address column holding the address to geocode, or None when the
+    row already has its own city, state and zip.
+    """
+    # Drop blank rows before any transform runs, and represent the
+    # remaining empty cells as None rather than NaN
+    df = df.dropna(how='all')
+    df = df.astype(object).where(df.notna(), None)
+
+    records = pd.DataFrame(index=df.index)
+    ages = get_ages_served_columns(df)
+    license_type = _coalesce(df, 'Credential Type', 'Type License', 'Type')
+    contact_name = _coalesce(df, 'Primary Contact Name', 'Primary Caregiver')
+    titles = extract_titles(contact_name.fillna(''))
+
+    records['accepts_financial_aid'] = _text(df, 'Accepts Subsidy').str.lower().eq('accepts subsidy')
+    records['ages_served'] = ages['ages_served'].where(ages['ages_served'].ne(''), None)
+    records['capacity'] = _coalesce(df, 'Total Cap', 'Capacity')
+    records['certificate_expiration_date'] = parse_dates(_coalesce(df, 'Expiration Date'))
+    records['city'] = _coalesce(df, 'City')
+    records['address1'] = _coalesce(df, 'Address', 'Address1')
+    records['address2'] = _coalesce(df, 'Address2')
+    records['company'] = _coalesce(df, 'Name', 'Company', 'Operation Name')
+    records['phone'] = clean_phones(df['Phone']) if 'Phone' in df else None
+    records['phone2'] = None
+    records['county'] = _coalesce(df, 'County')
+    records['curriculum_type'] = None
+    records['email'] = _coalesce(df, 'Email', 'Email Address')
+    records['license_status'] = _coalesce(df, 'Status')
+    records['license_issued'] = parse_dates(_coalesce(df, 'Issue Date', 'First Issue Date'))
+    records['license_number'] = _coalesce(df, 'Credential Number', 'Operator')
+    records['license_renewed'] = None
+    records['license_type'] = license_type
+    records['contact_name'] = contact_name
+    records['max_age'] = ages['max_age']
+    records['min_age'] = ages['min_age']
+    records['operator'] = None
+    records['schedule'] = _coalesce(df, 'Year Round')
+    records['state'] = _coalesce(df, 'State')
+    records['title'] = _first_present(df.index, titles, _coalesce(df, 'Primary Contact Role'))
+    records['website_address'] = None
+    records['zip'] = _coalesce(df, 'Zip')
+    records['facility_type'] = license_type
+    records['source_file'] = sheet_name
+
+    # Only geocode when the row is missing part of its location
+    full_address = _coalesce(df, 'Address', 'Address 1').fillna(
+        _text(df, 'Address') + ', ' + _text(df, 'City') + ' ' + _text(df, 'State') + ' ' + _text(df, 'Zip')
+    )
+    located = records['city'].notna() & records['state'].notna() & records['zip'].notna()
+    records['full_address'] = full_address.where(~located, None)
+
+    return records.astype(object)
+
+
+def _upsert_rows(table: Any, con: Any, keys: List[str], data_iter: Any) -> None:
+    """DataFrame.to_sql insert method that upserts rows on their address."""
+    con.executemany(_UPSERT_SQL, data_iter)
+
+
+def connect_database(database_name: str = DATABASE_NAME) -> sqlite3.Connection:
+    """Open the SQLite database and create the providers table if needed."""
+    conn = sqlite3.connect(database_name)
+
+    # Tune SQLite for bulk loading: WAL journaling with relaxed syncing avoids an
+    # fsync per statement, and a larger page cache keeps the working set in memory
+    conn.executescript('''
+    PRAGMA journal_mode=WAL;
+    PRAGMA synchronous=NORMAL;
+    PRAGMA temp_store=MEMORY;
+    PRAGMA cache_size=-65536;
+    ''')
+
+    # Create the table (updated schema)
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS child_care_providers (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        accepts_financial_aid TEXT,
+        ages_served TEXT,
+        capacity INTEGER,
+        certificate_expiration_date DATE,
+        city TEXT,
+        address1 TEXT,
+        address2 TEXT,
+        company TEXT,
+        phone TEXT,
+        phone2 TEXT,
+        county TEXT,
+        curriculum_type TEXT,
+        email TEXT,
+        language TEXT,
+        license_status TEXT,
+        license_issued DATE,
+        license_number INTEGER,
+        license_renewed DATE,
+        license_type TEXT,
+        contact_name TEXT,
+        max_age INTEGER,
+        min_age INTEGER,
+        operator TEXT,
+        schedule TEXT,
+        state TEXT,
+        title TEXT,
+        website_address TEXT,
+        zip TEXT,
+        facility_type TEXT,
+        source_file TEXT,
+        etl_timestamp DATETIME,
+        record_hash TEXT
+    )
+    ''')
+
+    # Records are deduplicated on their address
+    conn.execute('''
+    CREATE UNIQUE INDEX IF NOT EXISTS ux_addr ON child_care_providers (address1, city, state)
+    ''')
+    return conn
+
+
+def process_excel_file(file_path: str, conn: sqlite3.Connection) -> None:
     """Process the Excel file and load data into the database."""
-    wb = load_workbook(filename=file_path, read_only=True)
-    
-    for sheet_name in ['source1', 'source2', 'source3']:
-        sheet = wb[sheet_name]
-        headers = [cell.value for cell in sheet[1]]
-        
-        for row in sheet.iter_rows(min_row=2, values_only=True):
-            row_data = dict(zip(headers, row))
-            if all_none(row_data):
-                continue
-            
-            # Common data extraction
-            age_data = {
-                'Ages Accepted 1': row_data.get('Ages Accepted 1'),
-                'AA2': row_data.get('AA2'),
-                'AA3': row_data.get('AA3'),
-                'AA4': row_data.get('AA4'),
-                'Infant': row_data.get('Infant'),
-                'Toddler': row_data.get('Toddler'),
-                'Preschool': row_data.get('Preschool'),
-                'School': row_data.get('School')
-            }
-            
-            ages_served, min_age, max_age = get_ages_served(age_data)
-            
-            contact_name = row_data.get('Primary Contact Name') or row_data.get('Primary Caregiver') or ''
-            title = extract_title(contact_name) or row_data.get('Primary Contact Role') or ''
-            
-            full_address = (
-                row_data.get('Address') or
-                row_data.get('Address 1') or
-                f"{row_data.get('Address')}, {row_data.get('City')} {row_data.get('State')} {row_data.get('Zip')}" or
-                None
-            )
-            
-            state, city, zip_code = None, None, None
-            if full_address:
-                state, city, zip_code = geocode_address(full_address)
-            
-                data = {
-                    'accepts_financial_aid': str(row_data.get('Accepts Subsidy', '')).lower() == 'accepts subsidy',
-                    'ages_served': ages_served or None,
-                    'capacity': row_data.get('Total Cap') or row_data.get('Capacity') or None,
-                    'certificate_expiration_date': parse_date(row_data.get('Expiration Date')) or None,
-                    'city': city or row_data.get('City') or None,
-                    'address1': row_data.get('Address') or row_data.get('Address1') or None,
-                    'address2': row_data.get('Address2') or None,
-                    'company': row_data.get('Name') or row_data.get('Company') or row_data.get('Operation Name') or None,
-                    'phone': clean_phone(row_data.get('Phone') or '') or None,
-                    'phone2': None,
-                    'county': row_data.get('County') or None,
-                    'curriculum_type': None,
-                    'email': row_data.get('Email') or row_data.get('Email Address') or None,
-                    'license_status': row_data.get('Status') or None,
-                    'license_issued': parse_date(row_data.get('Issue Date') or row_data.get('First Issue Date')) or None,
-                    'license_number': row_data.get('Credential Number') or row_data.get('Operator') or None,
-                    'license_renewed': None,
-                    'license_type': row_data.get('Credential Type') or row_data.get('Type License') or row_data.get('Type') or None,
-                    'contact_name': contact_name or None,
-                    'max_age': max_age,
-                    'min_age': min_age,
-                    'operator': None,
-                    'schedule': row_data.get('Year Round', '') or None,
-                    'state': state or row_data.get('State') or None,
-                    'title': title or None,
-                    'website_address': None,
-                    'zip': zip_code or row_data.get('Zip') or None,
-                    'facility_type': row_data.get('Credential Type') or row_data.get('Type License') or row_data.get('Type') or None,
-                    'source_file': sheet_name,
-                    'etl_timestamp': datetime.now().isoformat()
-                }
-
-                # Generate a hash for the record
-                record_hash = hashlib.md5(str(data).encode()).hexdigest()
-                data['record_hash'] = record_hash
-
-                # Check if the record already exists
-                cursor.execute('SELECT id FROM child_care_providers WHERE (address1 = ? AND city = ? AND state = ?)',
-                            (data['address1'], data['city'], data['state']))
-                
-                existing_record = cursor.fetchone()
-
-                if existing_record:
-                    # Update the existing record
-                    update_query = 'UPDATE child_care_providers SET ' + ', '.join([f'{k} = ?' for k in data.keys()]) + ' WHERE id = ?'
-                    cursor.execute(update_query, list(data.values()) + [existing_record[0]])
-                else:
-                # Insert a new record
-                    insert_query = 'INSERT INTO child_care_providers (' + ', '.join(data.keys()) + ') VALUES (' + ', '.join(['?' if v is not None else 'NULL' for v in data.values()]) + ')'
-                    cursor.execute(insert_query, [v for v in data.values() if v is not None])
-
-        conn.commit()
-
-    wb.close()
+    # Read every sheet in one pass, keeping sheet order so later sheets
+    # still win when they repeat an address
+    sheets = pd.read_excel(file_path, sheet_name=SHEET_NAMES, engine='calamine')
+    records = pd.concat(
+        [parse_sheet(df, sheet_name) for sheet_name, df in sheets.items()],
+        ignore_index=True
+    )
+
+    # Geocoded values take precedence over the row's own
+    locations = pd.DataFrame(
+        geocode_addresses(records.pop('full_address').tolist()),
+        columns=['state', 'city', 'zip'],
+        dtype=object
+    )
+    for column in locations:
+        records[column] = _first_present(records.index, locations[column], records[column])
+
+    # Hash each record's values, leaving out the load timestamp so the
+    # hash only changes when the source data does
+    records['record_hash'] = [
+        hashlib.blake2b(orjson.dumps(data, default=str, option=orjson.OPT_SORT_KEYS), digest_size=16).hexdigest()
+        for data in records.to_dict('records')
+    ]
+    records['etl_timestamp'] = datetime.now().isoformat()
+
+    # Load all sheets inside a single explicit transaction, rolling it back
+    # if anything fails
+    with conn:
+        conn.execute('BEGIN IMMEDIATE')
+        records[list(_COLUMNS)].to_sql(
+            'child_care_providers', conn, if_exists='append', index=False,
+            chunksize=INSERT_BATCH_SIZE, method=_upsert_rows
+        )
+
 
 # Main execution
 if __name__ == "__main__":
-    process_excel_file('Technical Exercise Data.xlsx')
+    conn = connect_database(DATABASE_NAME)
+    process_excel_file(EXCEL_FILE_NAME, conn)
     conn.close()
     print("ETL process completed successfully.")
     
@@ -9,11 +9,16 @@ import unittest
 from unittest.mock import patch, MagicMock
 import pandas as pd
 import numpy as np
+import requests
 from datetime import datetime, date
-from etl import clean_phone, parse_date, get_ages_served, extract_title, geocode_address
+from etl import (
+    clean_phone, parse_date, get_ages_served, extract_title, geocode_address, geocode_addresses,
+    clean_phones, parse_dates, get_ages_served_columns, extract_titles,
+    connect_database, process_excel_file
+)
 
 class TestETLFunctions(unittest.TestCase):
-     """Test cases for ETL functions."""
+    """Test cases for ETL functions."""
     def test_clean_phone(self):
         self.assertEqual(clean_phone("(123) 456-7890"), "1234567890")
         self.assertEqual(clean_phone("123-456-7890"), "1234567890")
@@ -24,6 +29,9 @@ class TestETLFunctions(unittest.TestCase):
     def test_parse_date(self):
         self.assertEqual(parse_date("01/15/22"), date(2022, 1, 15))
         self.assertEqual(parse_date("12/31/99"), date(1999, 12, 31))
+        self.assertEqual(parse_date("1/5/68"), date(2068, 1, 5))
+        self.assertEqual(parse_date("02/30/22"), None)
+        self.assertEqual(parse_date("01/15/2022"), None)
         self.assertEqual(parse_date("Invalid Date"), None)
         self.assertEqual(parse_date(None), None)
         self.assertEqual(parse_date(datetime(2022, 1, 15)), date(2022, 1, 15))
@@ -52,6 +60,10 @@ class TestETLFunctions(unittest.TestCase):
         row6 = pd.Series({'Infant': None, 'Toddler': None, 'Preschool': None, 'School': None})
         self.assertEqual(get_ages_served(row6), ('', None, None))
 
+        # Test with the School flag column
+        row7 = {'Infant': 'Y', 'Toddler': 'N', 'Preschool': None, 'School': 'Y'}
+        self.assertEqual(get_ages_served(row7), ('Infants, School-age', 0, 11))
+
     def test_extract_title(self):
         self.assertEqual(extract_title("John Doe - Director"), "Director")
         self.assertEqual(extract_title("Jane Smith, Owner"), "Owner")
@@ -60,8 +72,85 @@ class TestETLFunctions(unittest.TestCase):
         self.assertEqual(extract_title("No Title Here"), None)
         self.assertEqual(extract_title(None), None)
 
-    @patch('etl.requests.get')
-    def test_geocode_address(self, mock_get):
+    def test_clean_phones(self):
+        phones = pd.Series(["(123) 456-7890", "123.456.7890", None, ""])
+        self.assertEqual(clean_phones(phones).tolist(), ["1234567890", "1234567890", None, None])
+
+    def test_parse_dates(self):
+        dates = pd.Series(["01/15/22", "12/31/99", "Invalid Date", None, datetime(2022, 1, 15)], dtype=object)
+        self.assertEqual(
+            parse_dates(dates).tolist(),
+            [date(2022, 1, 15), date(1999, 12, 31), None, None, date(2022, 1, 15)]
+        )
+
+    def test_get_ages_served_columns(self):
+        df = pd.DataFrame({
+            'Ages Accepted 1': ['Toddlers (12-23 months)', 'School-age (5 years and up)', None],
+            'AA2': ['Preschool (24-48 months)', None, None],
+            'Infant': [None, None, 'Y'],
+            'School': [None, None, 'Y'],
+        })
+        result = get_ages_served_columns(df)
+        self.assertEqual(
+            list(result.itertuples(index=False, name=None)),
+            [('Toddlers, Preschool', 12, 59), ('School-age', 60, None), ('Infants, School-age', 0, 11)]
+        )
+
+        # Overlapping and mixed-case age group names in one cell all match
+        df = pd.DataFrame({'AA3': ['preschool-age, INFANTS']})
+        self.assertEqual(
+            list(get_ages_served_columns(df).itertuples(index=False, name=None)),
+            [('Infants, Preschool, School-age', 0, 59)]
+        )
+
+        # read_excel gives an empty column as all-NaN float64
+        df = pd.DataFrame({'Ages Accepted 1': ['Infants (0-11 months)', None], 'AA4': [np.nan, np.nan]})
+        self.assertEqual(
+            list(get_ages_served_columns(df).itertuples(index=False, name=None)),
+            [('Infants', 0, 11), ('', None, None)]
+        )
+
+    def test_extract_titles(self):
+        names = pd.Series(["John Doe - Director", "Primary Caregiver: Alice Johnson", "No Title Here"])
+        self.assertEqual(extract_titles(names).tolist(), ["Director", "Primary Caregiver", None])
+
+    def test_scalar_and_column_helpers_agree(self):
+        """Test that each scalar helper matches its column-wise counterpart."""
+        # The scalar helpers return '' where the column ones return None
+        phones = ["(123) 456-7890", " 123 ", "", None, np.nan, 5125551234, "no digits"]
+        self.assertEqual(
+            [clean_phone(phone) or None for phone in phones],
+            clean_phones(pd.Series(phones, dtype=object)).tolist()
+        )
+
+        dates = [
+            "01/15/22", " 01/15/22", "01/15/22 ", "1/5/68", "1/ 5/22", "1 /5/22", "001/05/22", "+1/5/22",
+            "02/30/22", "01/15/2022", "2022-01-15", "", None, np.nan, datetime(2022, 1, 15), date(2022, 1, 15)
+        ]
+        self.assertEqual(
+            [parse_date(value) for value in dates],
+            parse_dates(pd.Series(dates, dtype=object)).tolist()
+        )
+
+        names = ["John Doe - Director", "Jane Smith, Owner", "Directors", "", None, np.nan]
+        self.assertEqual(
+            [extract_title(name) for name in names],
+            extract_titles(pd.Series(names, dtype=object)).tolist()
+        )
+
+        rows = [
+            {'Ages Accepted 1': 'Toddlers (12-23 months)', 'AA2': 'preschool-age', 'Infant': 'y'},
+            {'AA4': 'INFANTS', 'Toddler': 'N', 'School': 'Y'},
+            {'Preschool': 'Y', 'AA3': np.nan},
+            {'Ages Accepted 1': None, 'Infant': np.nan},
+        ]
+        self.assertEqual(
+            [get_ages_served(row) for row in rows],
+            list(get_ages_served_columns(pd.DataFrame(rows, dtype=object)).itertuples(index=False, name=None))
+        )
+
+    @patch('etl._geo_session')
+    def test_geocode_address(self, mock_session):
         """Test the geocode_address function with mocked API response."""
         mock_response = MagicMock()
         mock_response.status_code = 200
@@ -74,7 +163,7 @@ class TestETLFunctions(unittest.TestCase):
                 }
             }]
         }
-        mock_get.return_value = mock_response
+        mock_session.return_value.get.return_value = mock_response
 
         self.assertEqual(
             geocode_address("123 Main St, Austin, TX 78701"),
@@ -88,5 +177,97 @@ class TestETLFunctions(unittest.TestCase):
             (None, None, None)
         )
 
+    @patch('etl.time.sleep')
+    @patch('etl._geo_session')
+    def test_geocode_address_retries_rate_limit(self, mock_session, mock_sleep):
+        """Test that geocode_address backs off and retries on HTTP 429."""
+        limited = MagicMock(status_code=429)
+        ok = MagicMock(status_code=200)
+        ok.json.return_value = {'results': [{'address': {'countrySubdivision': 'OK'}}]}
+        mock_get = mock_session.return_value.get
+        mock_get.side_effect = [limited, limited, ok]
+
+        self.assertEqual(geocode_address("10900 NW 38TH TERRACE"), ('OK', None, None))
+        self.assertEqual(mock_get.call_count, 3)
+        self.assertEqual(mock_sleep.call_count, 2)
+
+    @patch('etl._geo_session')
+    @patch('etl.geocode_address')
+    def test_geocode_addresses(self, mock_geocode, mock_session):
+        """Test that geocode_addresses keeps input order and skips empty entries."""
+        mock_geocode.side_effect = lambda address: (address, None, None)
+        self.assertEqual(
+            geocode_addresses(['A', None, 'B']),
+            [('A', None, None), (None, None, None), ('B', None, None)]
+        )
+        self.assertEqual(mock_geocode.call_count, 2)
+
+    @patch('etl._geo_session')
+    def test_geocode_address_request_error(self, mock_session):
+        """Test that geocode_address treats a failed request like a non-200 response."""
+        mock_session.return_value.get.side_effect = requests.exceptions.Timeout()
+        self.assertEqual(geocode_address("123 Main St"), (None, None, None))
+
+    @patch('etl._geo_session')
+    @patch('etl.geocode_address', return_value=(None, None, None))
+    @patch('etl.pd.read_excel')
+    def test_process_excel_file(self, mock_read_excel, mock_geocode, mock_session):
+        """Test loading sheets into the database, upserting on address."""
+        mock_read_excel.return_value = {
+            'source1': pd.DataFrame({
+                'Name': ['Sunshine Academy', np.nan, 'Sunshine Academy'],
+                'Address': ['150 N. WILLOW ST', np.nan, '150 N. WILLOW ST'],
+                'State': ['NV', np.nan, 'NV'],
+                'Phone': ['346-393-9400', np.nan, '346-393-9400'],
+            }),
+            'source2': pd.DataFrame({
+                'Company': ['First Name', 'Second Name'],
+                'Address1': ['10900 NW 38TH TERRACE', '10900 NW 38TH TERRACE'],
+                'City': ['YUKON', 'YUKON'],
+                'State': ['OK', 'OK'],
+                'Zip': [73099, 73099],
+            }),
+            'source3': pd.DataFrame({
+                'Operation Name': ['Third Name'],
+                'Address': ['10900 NW 38TH TERRACE'],
+                'City': ['YUKON'],
+                'State': ['OK'],
+                'Zip': [73099],
+                'Infant': ['Y'],
+            }),
+        }
+        conn = connect_database(':memory:')
+        process_excel_file('workbook.xlsx', conn)
+
+        rows = conn.execute(
+            'SELECT company, address1, city, state, zip, ages_served, source_file '
+            'FROM child_care_providers ORDER BY id'
+        ).fetchall()
+        self.assertEqual(rows, [
+            # Rows without a city never conflict, so both are kept
+            ('Sunshine Academy', '150 N. WILLOW ST', None, 'NV', None, None, 'source1'),
+            ('Sunshine Academy', '150 N. WILLOW ST', None, 'NV', None, None, 'source1'),
+            # A repeated address is updated in place, and the last sheet wins
+            ('Third Name', '10900 NW 38TH TERRACE', 'YUKON', 'OK', '73099', 'Infants', 'source3'),
+        ])
+        # Only the rows missing part of their location are geocoded
+        self.assertEqual(mock_geocode.call_count, 2)
+        conn.close()
+
+    @patch('etl._geo_session')
+    @patch('etl.geocode_address', return_value=(None, None, None))
+    @patch('etl.pd.DataFrame.to_sql', side_effect=ValueError('load failed'))
+    @patch('etl.pd.read_excel')
+    def test_process_excel_file_rolls_back(self, mock_read_excel, mock_to_sql, mock_geocode, mock_session):
+        """Test that a failed load does not leave its transaction open."""
+        mock_read_excel.return_value = {
+            'source1': pd.DataFrame({'Name': ['Sunshine Academy'], 'Address': ['150 N. WILLOW ST'], 'State': ['NV']}),
+        }
+        conn = connect_database(':memory:')
+        with self.assertRaises(ValueError):
+            process_excel_file('workbook.xlsx', conn)
+        self.assertFalse(conn.in_transaction)
+        conn.close()
+
 if __name__ == '__main__':
     unittest.main()